@@ -1,7 +1,8 @@
 """Support for MQTT fans."""
 from __future__ import annotations
 
-from collections.abc import Callable
+import asyncio
+from collections.abc import Callable, Mapping
 import functools
 import logging
 import math
@@ -27,6 +28,7 @@ from homeassistant.const import (
 )
 from homeassistant.core import HomeAssistant, callback
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.template import Template
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
@@ -57,6 +59,7 @@ from .mixins import (
     warn_for_legacy_schema,
 )
 from .models import (
+    MessageCallbackType,
     MqttCommandTemplate,
     MqttValueTemplate,
     PublishPayloadType,
@@ -118,6 +121,11 @@ MQTT_FAN_ATTRIBUTES_BLOCKED = frozenset(
 _LOGGER = logging.getLogger(__name__)
 
 
+def _passthrough_payload(payload: Any) -> Any:
+    """Return a payload unchanged, used when no template is configured."""
+    return payload
+
+
 def valid_speed_range_configuration(config: ConfigType) -> ConfigType:
     """Validate that the fan speed_range configuration is valid, throws if it isn't."""
     if config[CONF_SPEED_RANGE_MIN] == 0:
@@ -271,17 +279,25 @@ class MqttFan(MqttEntity, FanEntity):
     _entity_id_format = fan.ENTITY_ID_FORMAT
     _attributes_extra_blocked = MQTT_FAN_ATTRIBUTES_BLOCKED
 
-    _command_templates: dict[str, Callable[[PublishPayloadType], PublishPayloadType]]
-    _value_templates: dict[str, Callable[[ReceivePayloadType], ReceivePayloadType]]
+    _encoding: str
+    _qos: int
+    _retain: bool
+    _command_templates: Mapping[str, Callable[[PublishPayloadType], PublishPayloadType]]
+    _value_templates: Mapping[str, Callable[[ReceivePayloadType], ReceivePayloadType]]
     _feature_percentage: bool
     _feature_preset_mode: bool
-    _topic: dict[str, Any]
+    _topic: Mapping[str, Any]
     _optimistic: bool
     _optimistic_oscillation: bool
     _optimistic_percentage: bool
     _optimistic_preset_mode: bool
-    _payload: dict[str, Any]
+    _payload: Mapping[str, Any]
+    _percentage_lookup: tuple[int, ...] | None
+    _preset_modes_set: frozenset[str]
+    _rendered_payloads: dict[str, PublishPayloadType]
     _speed_range: tuple[int, int]
+    _topic_handlers: dict[str, list[MessageCallbackType]]
+    _write_state_request: Callable[[Entity], None]
 
     def __init__(
         self,
@@ -303,6 +319,9 @@ class MqttFan(MqttEntity, FanEntity):
 
     def _setup_from_config(self, config: ConfigType) -> None:
         """(Re)Setup the entity."""
+        self._qos = config[CONF_QOS]
+        self._retain = config[CONF_RETAIN]
+        self._encoding = config[CONF_ENCODING]
         self._speed_range = (
             config[CONF_SPEED_RANGE_MIN],
             config[CONF_SPEED_RANGE_MAX],
@@ -333,14 +352,27 @@ class MqttFan(MqttEntity, FanEntity):
         self._feature_preset_mode = CONF_PRESET_MODE_COMMAND_TOPIC in config
         if self._feature_preset_mode:
             self._attr_preset_modes = config[CONF_PRESET_MODES_LIST]
+            self._preset_modes_set = frozenset(config[CONF_PRESET_MODES_LIST])
         else:
             self._attr_preset_modes = []
+            self._preset_modes_set = frozenset()
 
         self._attr_speed_count = (
             min(int_states_in_range(self._speed_range), 100)
             if self._feature_percentage
             else 100
         )
+        # Map received speeds through a lookup table for small speed ranges,
+        # indexed from the range offset, values outside it are out of range
+        self._percentage_lookup = (
+            tuple(
+                ranged_value_to_percentage(self._speed_range, value)
+                for value in range(self._speed_range[0] - 1, self._speed_range[1] + 1)
+            )
+            if self._topic[CONF_PERCENTAGE_STATE_TOPIC] is not None
+            and int_states_in_range(self._speed_range) <= 100
+            else None
+        )
 
         optimistic = config[CONF_OPTIMISTIC]
         self._optimistic = optimistic or self._topic[CONF_STATE_TOPIC] is None
@@ -354,15 +386,14 @@ class MqttFan(MqttEntity, FanEntity):
             optimistic or self._topic[CONF_PRESET_MODE_STATE_TOPIC] is None
         )
 
-        self._attr_supported_features = 0
-        self._attr_supported_features |= (
-            self._topic[CONF_OSCILLATION_COMMAND_TOPIC] is not None
-            and FanEntityFeature.OSCILLATE
-        )
+        supported_features = 0
+        if self._topic[CONF_OSCILLATION_COMMAND_TOPIC] is not None:
+            supported_features |= FanEntityFeature.OSCILLATE
         if self._feature_percentage:
-            self._attr_supported_features |= FanEntityFeature.SET_SPEED
+            supported_features |= FanEntityFeature.SET_SPEED
         if self._feature_preset_mode:
-            self._attr_supported_features |= FanEntityFeature.PRESET_MODE
+            supported_features |= FanEntityFeature.PRESET_MODE
+        self._attr_supported_features = supported_features
 
         command_templates: dict[str, Template | None] = {
             CONF_STATE: config.get(CONF_COMMAND_TEMPLATE),
@@ -370,163 +401,230 @@ class MqttFan(MqttEntity, FanEntity):
             ATTR_PRESET_MODE: config.get(CONF_PRESET_MODE_COMMAND_TEMPLATE),
             ATTR_OSCILLATING: config.get(CONF_OSCILLATION_COMMAND_TEMPLATE),
         }
-        self._command_templates = {}
+        # Skip the template wrappers when no template is configured
+        command_renderers: dict[
+            str, Callable[[PublishPayloadType], PublishPayloadType]
+        ] = {}
         for key, tpl in command_templates.items():
-            self._command_templates[key] = MqttCommandTemplate(
-                tpl, entity=self
-            ).async_render
+            if tpl is None:
+                command_renderers[key] = _passthrough_payload
+            else:
+                command_renderers[key] = MqttCommandTemplate(
+                    tpl, entity=self
+                ).async_render
+        self._command_templates = command_renderers
+
+        # The on, off and oscillation payloads are constant, render them once
+        # if their command template does not depend on the entity or its state
+        self._rendered_payloads = {
+            payload_key: command_renderers[template_key](self._payload[payload_key])
+            for template_key, payload_key in (
+                (CONF_STATE, "STATE_ON"),
+                (CONF_STATE, "STATE_OFF"),
+                (ATTR_OSCILLATING, "OSCILLATE_ON_PAYLOAD"),
+                (ATTR_OSCILLATING, "OSCILLATE_OFF_PAYLOAD"),
+            )
+            if (tpl := command_templates[template_key]) is None or tpl.is_static
+        }
 
-        self._value_templates = {}
         value_templates: dict[str, Template | None] = {
             CONF_STATE: config.get(CONF_STATE_VALUE_TEMPLATE),
             ATTR_PERCENTAGE: config.get(CONF_PERCENTAGE_VALUE_TEMPLATE),
             ATTR_PRESET_MODE: config.get(CONF_PRESET_MODE_VALUE_TEMPLATE),
             ATTR_OSCILLATING: config.get(CONF_OSCILLATION_VALUE_TEMPLATE),
         }
+        value_renderers: dict[
+            str, Callable[[ReceivePayloadType], ReceivePayloadType]
+        ] = {}
         for key, tpl in value_templates.items():
-            self._value_templates[key] = MqttValueTemplate(
-                tpl,
-                entity=self,
-            ).async_render_with_possible_json_value
+            if tpl is None:
+                value_renderers[key] = _passthrough_payload
+            else:
+                value_renderers[key] = MqttValueTemplate(
+                    tpl,
+                    entity=self,
+                ).async_render_with_possible_json_value
+        self._value_templates = value_renderers
 
     def _prepare_subscribe_topics(self) -> None:
         """(Re)Subscribe to topics."""
-        topics: dict[str, Any] = {}
-
-        @callback
-        @log_messages(self.hass, self.entity_id)
-        def state_received(msg: ReceiveMessage) -> None:
-            """Handle new received MQTT message."""
-            payload = self._value_templates[CONF_STATE](msg.payload)
-            if not payload:
-                _LOGGER.debug("Ignoring empty state from '%s'", msg.topic)
-                return
-            if payload == self._payload["STATE_ON"]:
-                self._attr_is_on = True
-            elif payload == self._payload["STATE_OFF"]:
-                self._attr_is_on = False
-            elif payload == PAYLOAD_NONE:
-                self._attr_is_on = None
-            get_mqtt_data(self.hass).state_write_requests.write_state_request(self)
+        handlers: dict[str, list[MessageCallbackType]] = {}
+        self._write_state_request = get_mqtt_data(
+            self.hass
+        ).state_write_requests.write_state_request
 
         if self._topic[CONF_STATE_TOPIC] is not None:
-            topics[CONF_STATE_TOPIC] = {
-                "topic": self._topic[CONF_STATE_TOPIC],
-                "msg_callback": state_received,
-                "qos": self._config[CONF_QOS],
-                "encoding": self._config[CONF_ENCODING] or None,
-            }
-
-        @callback
-        @log_messages(self.hass, self.entity_id)
-        def percentage_received(msg: ReceiveMessage) -> None:
-            """Handle new received MQTT message for the percentage."""
-            rendered_percentage_payload = self._value_templates[ATTR_PERCENTAGE](
-                msg.payload
+            handlers.setdefault(self._topic[CONF_STATE_TOPIC], []).append(
+                self._state_received
             )
-            if not rendered_percentage_payload:
-                _LOGGER.debug("Ignoring empty speed from '%s'", msg.topic)
-                return
-            if rendered_percentage_payload == self._payload["PERCENTAGE_RESET"]:
-                self._attr_percentage = None
-                get_mqtt_data(self.hass).state_write_requests.write_state_request(self)
-                return
-            try:
-                percentage = ranged_value_to_percentage(
-                    self._speed_range, int(rendered_percentage_payload)
-                )
-            except ValueError:
-                _LOGGER.warning(
-                    "'%s' received on topic %s. '%s' is not a valid speed within the speed range",
-                    msg.payload,
-                    msg.topic,
-                    rendered_percentage_payload,
-                )
-                return
-            if percentage < 0 or percentage > 100:
-                _LOGGER.warning(
-                    "'%s' received on topic %s. '%s' is not a valid speed within the speed range",
-                    msg.payload,
-                    msg.topic,
-                    rendered_percentage_payload,
-                )
-                return
-            self._attr_percentage = percentage
-            get_mqtt_data(self.hass).state_write_requests.write_state_request(self)
 
         if self._topic[CONF_PERCENTAGE_STATE_TOPIC] is not None:
-            topics[CONF_PERCENTAGE_STATE_TOPIC] = {
-                "topic": self._topic[CONF_PERCENTAGE_STATE_TOPIC],
-                "msg_callback": percentage_received,
-                "qos": self._config[CONF_QOS],
-                "encoding": self._config[CONF_ENCODING] or None,
-            }
+            handlers.setdefault(self._topic[CONF_PERCENTAGE_STATE_TOPIC], []).append(
+                self._percentage_received
+            )
             self._attr_percentage = None
 
-        @callback
-        @log_messages(self.hass, self.entity_id)
-        def preset_mode_received(msg: ReceiveMessage) -> None:
-            """Handle new received MQTT message for preset mode."""
-            preset_mode = str(self._value_templates[ATTR_PRESET_MODE](msg.payload))
-            if preset_mode == self._payload["PRESET_MODE_RESET"]:
-                self._attr_preset_mode = None
-                self.async_write_ha_state()
-                return
-            if not preset_mode:
-                _LOGGER.debug("Ignoring empty preset_mode from '%s'", msg.topic)
-                return
-            if not self.preset_modes or preset_mode not in self.preset_modes:
-                _LOGGER.warning(
-                    "'%s' received on topic %s. '%s' is not a valid preset mode",
-                    msg.payload,
-                    msg.topic,
-                    preset_mode,
-                )
-                return
-
-            self._attr_preset_mode = preset_mode
-            get_mqtt_data(self.hass).state_write_requests.write_state_request(self)
-
         if self._topic[CONF_PRESET_MODE_STATE_TOPIC] is not None:
-            topics[CONF_PRESET_MODE_STATE_TOPIC] = {
-                "topic": self._topic[CONF_PRESET_MODE_STATE_TOPIC],
-                "msg_callback": preset_mode_received,
-                "qos": self._config[CONF_QOS],
-                "encoding": self._config[CONF_ENCODING] or None,
-            }
+            handlers.setdefault(self._topic[CONF_PRESET_MODE_STATE_TOPIC], []).append(
+                self._preset_mode_received
+            )
             self._attr_preset_mode = None
 
-        @callback
-        @log_messages(self.hass, self.entity_id)
-        def oscillation_received(msg: ReceiveMessage) -> None:
-            """Handle new received MQTT message for the oscillation."""
-            payload = self._value_templates[ATTR_OSCILLATING](msg.payload)
-            if not payload:
-                _LOGGER.debug("Ignoring empty oscillation from '%s'", msg.topic)
-                return
-            if payload == self._payload["OSCILLATE_ON_PAYLOAD"]:
-                self._attr_oscillating = True
-            elif payload == self._payload["OSCILLATE_OFF_PAYLOAD"]:
-                self._attr_oscillating = False
-            get_mqtt_data(self.hass).state_write_requests.write_state_request(self)
-
         if self._topic[CONF_OSCILLATION_STATE_TOPIC] is not None:
-            topics[CONF_OSCILLATION_STATE_TOPIC] = {
-                "topic": self._topic[CONF_OSCILLATION_STATE_TOPIC],
-                "msg_callback": oscillation_received,
-                "qos": self._config[CONF_QOS],
-                "encoding": self._config[CONF_ENCODING] or None,
-            }
+            handlers.setdefault(self._topic[CONF_OSCILLATION_STATE_TOPIC], []).append(
+                self._oscillation_received
+            )
             self._attr_oscillating = False
 
+        # Subscriptions are kept as long as their topic, qos and encoding are
+        # unchanged, so the handlers are looked up when a message is received
+        self._topic_handlers = handlers
+
+        message_received = callback(
+            log_messages(self.hass, self.entity_id)(self._message_received)
+        )
+
+        # Topics shared between state topics only need a single subscription
         self._sub_state = subscription.async_prepare_subscribe_topics(
-            self.hass, self._sub_state, topics
+            self.hass,
+            self._sub_state,
+            {
+                topic: {
+                    "topic": topic,
+                    "msg_callback": message_received,
+                    "qos": self._qos,
+                    "encoding": self._encoding or None,
+                }
+                for topic in handlers
+            },
+        )
+
+    @callback
+    def _state_received(self, msg: ReceiveMessage) -> None:
+        """Handle new received MQTT message."""
+        payload = self._value_templates[CONF_STATE](msg.payload)
+        if not payload:
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Ignoring empty state from '%s'", msg.topic)
+            return
+        if payload == self._payload["STATE_ON"]:
+            self._attr_is_on = True
+        elif payload == self._payload["STATE_OFF"]:
+            self._attr_is_on = False
+        elif payload == PAYLOAD_NONE:
+            self._attr_is_on = None
+        self._write_state_request(self)
+
+    @callback
+    def _percentage_received(self, msg: ReceiveMessage) -> None:
+        """Handle new received MQTT message for the percentage."""
+        rendered_percentage_payload = self._value_templates[ATTR_PERCENTAGE](
+            msg.payload
         )
+        if not rendered_percentage_payload:
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Ignoring empty speed from '%s'", msg.topic)
+            return
+        if rendered_percentage_payload == self._payload["PERCENTAGE_RESET"]:
+            self._attr_percentage = None
+            self._write_state_request(self)
+            return
+        try:
+            value = int(rendered_percentage_payload)
+        except ValueError:
+            _LOGGER.warning(
+                "'%s' received on topic %s. '%s' is not a valid speed within the speed range",
+                msg.payload,
+                msg.topic,
+                rendered_percentage_payload,
+            )
+            return
+        if self._percentage_lookup is not None:
+            index = value - self._speed_range[0] + 1
+            percentage = (
+                self._percentage_lookup[index]
+                if 0 <= index < len(self._percentage_lookup)
+                else -1
+            )
+        else:
+            percentage = ranged_value_to_percentage(self._speed_range, value)
+        if percentage < 0 or percentage > 100:
+            _LOGGER.warning(
+                "'%s' received on topic %s. '%s' is not a valid speed within the speed range",
+                msg.payload,
+                msg.topic,
+                rendered_percentage_payload,
+            )
+            return
+        self._attr_percentage = percentage
+        self._write_state_request(self)
+
+    @callback
+    def _preset_mode_received(self, msg: ReceiveMessage) -> None:
+        """Handle new received MQTT message for preset mode."""
+        preset_mode = self._value_templates[ATTR_PRESET_MODE](msg.payload)
+        if not isinstance(preset_mode, str):
+            preset_mode = str(preset_mode)
+        if preset_mode == self._payload["PRESET_MODE_RESET"]:
+            self._attr_preset_mode = None
+            self.async_write_ha_state()
+            return
+        if not preset_mode:
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Ignoring empty preset_mode from '%s'", msg.topic)
+            return
+        if preset_mode not in self._preset_modes_set:
+            _LOGGER.warning(
+                "'%s' received on topic %s. '%s' is not a valid preset mode",
+                msg.payload,
+                msg.topic,
+                preset_mode,
+            )
+            return
+
+        self._attr_preset_mode = preset_mode
+        self._write_state_request(self)
+
+    @callback
+    def _oscillation_received(self, msg: ReceiveMessage) -> None:
+        """Handle new received MQTT message for the oscillation."""
+        payload = self._value_templates[ATTR_OSCILLATING](msg.payload)
+        if not payload:
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Ignoring empty oscillation from '%s'", msg.topic)
+            return
+        if payload == self._payload["OSCILLATE_ON_PAYLOAD"]:
+            self._attr_oscillating = True
+        elif payload == self._payload["OSCILLATE_OFF_PAYLOAD"]:
+            self._attr_oscillating = False
+        self._write_state_request(self)
+
+    def _message_received(self, msg: ReceiveMessage) -> None:
+        """Dispatch a received MQTT message to the handlers for its topic."""
+        for handler in self._topic_handlers.get(msg.subscribed_topic, ()):
+            # Handlers sharing a topic must not be skipped if one of them fails
+            try:
+                handler(msg)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception(
+                    "Exception in %s when handling msg on '%s': '%s'",
+                    handler.__name__,
+                    msg.topic,
+                    msg.payload,
+                )
 
     async def _subscribe_topics(self) -> None:
         """(Re)Subscribe to topics."""
         await subscription.async_subscribe_topics(self.hass, self._sub_state)
 
+    def _render_payload(
+        self, template_key: str, payload_key: str
+    ) -> PublishPayloadType:
+        """Return a rendered constant payload, rendering it if it is not cached."""
+        if payload_key in self._rendered_payloads:
+            return self._rendered_payloads[payload_key]
+        return self._command_templates[template_key](self._payload[payload_key])
+
     @property
     def assumed_state(self) -> bool:
         """Return true if we do optimistic updates."""
@@ -549,44 +647,76 @@ class MqttFan(MqttEntity, FanEntity):
 
         This method is a coroutine.
         """
-        mqtt_payload = self._command_templates[CONF_STATE](self._payload["STATE_ON"])
-        await self.async_publish(
-            self._topic[CONF_COMMAND_TOPIC],
-            mqtt_payload,
-            self._config[CONF_QOS],
-            self._config[CONF_RETAIN],
-            self._config[CONF_ENCODING],
-        )
+        mqtt_payload = self._render_payload(CONF_STATE, "STATE_ON")
+        publish_jobs = {
+            CONF_STATE: self.async_publish(
+                self._topic[CONF_COMMAND_TOPIC],
+                mqtt_payload,
+                self._qos,
+                self._retain,
+                self._encoding,
+            )
+        }
         if percentage:
-            await self.async_set_percentage(percentage)
+            publish_jobs[ATTR_PERCENTAGE] = self._async_publish_percentage(percentage)
         if preset_mode:
-            await self.async_set_preset_mode(preset_mode)
-        if self._optimistic:
+            publish_jobs[ATTR_PRESET_MODE] = self._async_publish_preset_mode(
+                preset_mode
+            )
+        # Send all commands back to back, an invalid preset mode
+        # must not prevent the other commands from being published
+        results = dict(
+            zip(
+                publish_jobs,
+                await asyncio.gather(*publish_jobs.values(), return_exceptions=True),
+            )
+        )
+        errors = [
+            result for result in results.values() if isinstance(result, BaseException)
+        ]
+        published = {
+            key
+            for key, result in results.items()
+            if not isinstance(result, BaseException)
+        }
+
+        # Update the optimistic state for the commands that were published,
+        # even if another command failed
+        write_state = False
+        if CONF_STATE in published and self._optimistic:
             self._attr_is_on = True
+            write_state = True
+        if ATTR_PERCENTAGE in published and self._optimistic_percentage:
+            self._attr_percentage = percentage
+            write_state = True
+        if ATTR_PRESET_MODE in published and self._optimistic_preset_mode:
+            self._attr_preset_mode = preset_mode
+            write_state = True
+        if write_state:
             self.async_write_ha_state()
 
+        if errors:
+            raise errors[0]
+
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn off the entity.
 
         This method is a coroutine.
         """
-        mqtt_payload = self._command_templates[CONF_STATE](self._payload["STATE_OFF"])
+        mqtt_payload = self._render_payload(CONF_STATE, "STATE_OFF")
         await self.async_publish(
             self._topic[CONF_COMMAND_TOPIC],
             mqtt_payload,
-            self._config[CONF_QOS],
-            self._config[CONF_RETAIN],
-            self._config[CONF_ENCODING],
+            self._qos,
+            self._retain,
+            self._encoding,
         )
         if self._optimistic:
             self._attr_is_on = False
             self.async_write_ha_state()
 
-    async def async_set_percentage(self, percentage: int) -> None:
-        """Set the percentage of the fan.
-
-        This method is a coroutine.
-        """
+    async def _async_publish_percentage(self, percentage: int) -> None:
+        """Publish the percentage command."""
         percentage_payload = math.ceil(
             percentage_to_ranged_value(self._speed_range, percentage)
         )
@@ -594,20 +724,24 @@ class MqttFan(MqttEntity, FanEntity):
         await self.async_publish(
             self._topic[CONF_PERCENTAGE_COMMAND_TOPIC],
             mqtt_payload,
-            self._config[CONF_QOS],
-            self._config[CONF_RETAIN],
-            self._config[CONF_ENCODING],
+            self._qos,
+            self._retain,
+            self._encoding,
         )
 
+    async def async_set_percentage(self, percentage: int) -> None:
+        """Set the percentage of the fan.
+
+        This method is a coroutine.
+        """
+        await self._async_publish_percentage(percentage)
+
         if self._optimistic_percentage:
             self._attr_percentage = percentage
             self.async_write_ha_state()
 
-    async def async_set_preset_mode(self, preset_mode: str) -> None:
-        """Set the preset mode of the fan.
-
-        This method is a coroutine.
-        """
+    async def _async_publish_preset_mode(self, preset_mode: str) -> None:
+        """Validate and publish the preset mode command."""
         self._valid_preset_mode_or_raise(preset_mode)
 
         mqtt_payload = self._command_templates[ATTR_PRESET_MODE](preset_mode)
@@ -615,11 +749,18 @@ class MqttFan(MqttEntity, FanEntity):
         await self.async_publish(
             self._topic[CONF_PRESET_MODE_COMMAND_TOPIC],
             mqtt_payload,
-            self._config[CONF_QOS],
-            self._config[CONF_RETAIN],
-            self._config[CONF_ENCODING],
+            self._qos,
+            self._retain,
+            self._encoding,
         )
 
+    async def async_set_preset_mode(self, preset_mode: str) -> None:
+        """Set the preset mode of the fan.
+
+        This method is a coroutine.
+        """
+        await self._async_publish_preset_mode(preset_mode)
+
         if self._optimistic_preset_mode:
             self._attr_preset_mode = preset_mode
             self.async_write_ha_state()
@@ -630,20 +771,20 @@ class MqttFan(MqttEntity, FanEntity):
         This method is a coroutine.
         """
         if oscillating:
-            mqtt_payload = self._command_templates[ATTR_OSCILLATING](
-                self._payload["OSCILLATE_ON_PAYLOAD"]
+            mqtt_payload = self._render_payload(
+                ATTR_OSCILLATING, "OSCILLATE_ON_PAYLOAD"
             )
         else:
-            mqtt_payload = self._command_templates[ATTR_OSCILLATING](
-                self._payload["OSCILLATE_OFF_PAYLOAD"]
+            mqtt_payload = self._render_payload(
+                ATTR_OSCILLATING, "OSCILLATE_OFF_PAYLOAD"
             )
 
         await self.async_publish(
             self._topic[CONF_OSCILLATION_COMMAND_TOPIC],
             mqtt_payload,
-            self._config[CONF_QOS],
-            self._config[CONF_RETAIN],
-            self._config[CONF_ENCODING],
+            self._qos,
+            self._retain,
+            self._encoding,
         )
 
         if self._optimistic_oscillation:
@@ -1,6 +1,6 @@
 """Test MQTT fans."""
 import copy
-from unittest.mock import patch
+from unittest.mock import ANY, call, patch
 
 import pytest
 from voluptuous.error import MultipleInvalid
@@ -258,6 +258,14 @@ async def test_controlling_state_via_topic_with_different_speed_range(
                         "speed_range_min": 81,
                         "speed_range_max": 1023,
                     },
+                    {
+                        "name": "test4",
+                        "command_topic": "command-topic",
+                        "percentage_state_topic": "percentage-state-topic4",
+                        "percentage_command_topic": "percentage-command-topic4",
+                        "speed_range_min": 1,
+                        "speed_range_max": 3,
+                    },
                 ]
             }
         },
@@ -285,6 +293,22 @@ async def test_controlling_state_via_topic_with_different_speed_range(
     assert "not a valid speed within the speed range" in caplog.text
     caplog.clear()
 
+    async_fire_mqtt_message(hass, "percentage-state-topic4", "1")
+    state = hass.states.get("fan.test4")
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 33
+    async_fire_mqtt_message(hass, "percentage-state-topic4", "3")
+    state = hass.states.get("fan.test4")
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 100
+    async_fire_mqtt_message(hass, "percentage-state-topic4", "0")
+    state = hass.states.get("fan.test4")
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 0
+    assert "not a valid speed within the speed range" not in caplog.text
+    async_fire_mqtt_message(hass, "percentage-state-topic4", "4")
+    state = hass.states.get("fan.test4")
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 0
+    assert "not a valid speed within the speed range" in caplog.text
+    caplog.clear()
+
 
 async def test_controlling_state_via_topic_no_percentage_topics(
     hass, mqtt_mock_entry_with_yaml_config, caplog
@@ -449,6 +473,44 @@ async def test_controlling_state_via_topic_and_json_message(
     caplog.clear()
 
 
+async def test_controlling_percentage_via_topic_with_numeric_template(
+    hass, mqtt_mock_entry_with_yaml_config, caplog
+):
+    """Test the percentage value template is applied to numeric payloads."""
+    assert await async_setup_component(
+        hass,
+        mqtt.DOMAIN,
+        {
+            mqtt.DOMAIN: {
+                fan.DOMAIN: {
+                    "name": "test",
+                    "command_topic": "command-topic",
+                    "percentage_state_topic": "percentage-state-topic",
+                    "percentage_command_topic": "percentage-command-topic",
+                    "percentage_value_template": "{{ (value | int) // 10 }}",
+                    "speed_range_min": 1,
+                    "speed_range_max": 10,
+                }
+            }
+        },
+    )
+    await hass.async_block_till_done()
+    await mqtt_mock_entry_with_yaml_config()
+
+    async_fire_mqtt_message(hass, "percentage-state-topic", "50")
+    state = hass.states.get("fan.test")
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 50
+
+    async_fire_mqtt_message(hass, "percentage-state-topic", "100")
+    state = hass.states.get("fan.test")
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 100
+
+    async_fire_mqtt_message(hass, "percentage-state-topic", "110")
+    state = hass.states.get("fan.test")
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 100
+    assert "not a valid speed within the speed range" in caplog.text
+
+
 async def test_controlling_state_via_topic_and_json_message_shared_topic(
     hass, mqtt_mock_entry_with_yaml_config, caplog
 ):
@@ -487,7 +549,14 @@ async def test_controlling_state_via_topic_and_json_message_shared_topic(
         },
     )
     await hass.async_block_till_done()
-    await mqtt_mock_entry_with_yaml_config()
+    mqtt_mock = await mqtt_mock_entry_with_yaml_config()
+
+    # The shared topic is only subscribed once
+    assert [
+        subscribe_call
+        for subscribe_call in mqtt_mock.async_subscribe.mock_calls
+        if subscribe_call[1][0] == "shared-state-topic"
+    ] == [call("shared-state-topic", ANY, 0, "utf-8")]
 
     state = hass.states.get("fan.test")
     assert state.state == STATE_UNKNOWN
@@ -540,6 +609,40 @@ async def test_controlling_state_via_topic_and_json_message_shared_topic(
     caplog.clear()
 
 
+async def test_shared_topic_handler_exception(
+    hass, mqtt_mock_entry_with_yaml_config, caplog
+):
+    """Test a failing handler does not block other handlers on a shared topic."""
+    assert await async_setup_component(
+        hass,
+        mqtt.DOMAIN,
+        {
+            mqtt.DOMAIN: {
+                fan.DOMAIN: {
+                    "name": "test",
+                    "state_topic": "shared-state-topic",
+                    "command_topic": "command-topic",
+                    "state_value_template": "{{ 1 / 0 }}",
+                    "percentage_state_topic": "shared-state-topic",
+                    "percentage_command_topic": "percentage-command-topic",
+                }
+            }
+        },
+    )
+    await hass.async_block_till_done()
+    await mqtt_mock_entry_with_yaml_config()
+
+    async_fire_mqtt_message(hass, "shared-state-topic", "50")
+    state = hass.states.get("fan.test")
+    assert state.state == STATE_UNKNOWN
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 50
+    assert (
+        "Exception in _state_received when handling msg on 'shared-state-topic': '50'"
+        in caplog.text
+    )
+    assert "ZeroDivisionError" in caplog.text
+
+
 async def test_sending_mqtt_commands_and_optimistic(
     hass, mqtt_mock_entry_with_yaml_config, caplog
 ):
@@ -903,6 +1006,61 @@ async def test_sending_mqtt_commands_and_optimistic_no_legacy(
         await common.async_turn_on(hass, "fan.test", preset_mode="freaking-high")
 
 
+async def test_turn_on_with_percentage_and_preset_mode(
+    hass, mqtt_mock_entry_with_yaml_config
+):
+    """Test turning on with a percentage and preset mode publishes all commands."""
+    assert await async_setup_component(
+        hass,
+        mqtt.DOMAIN,
+        {
+            mqtt.DOMAIN: {
+                fan.DOMAIN: {
+                    "name": "test",
+                    "command_topic": "command-topic",
+                    "percentage_command_topic": "percentage-command-topic",
+                    "preset_mode_command_topic": "preset-mode-command-topic",
+                    "preset_modes": [
+                        "whoosh",
+                        "breeze",
+                        "silent",
+                    ],
+                }
+            }
+        },
+    )
+    await hass.async_block_till_done()
+    mqtt_mock = await mqtt_mock_entry_with_yaml_config()
+
+    await common.async_turn_on(hass, "fan.test", percentage=25, preset_mode="whoosh")
+    assert mqtt_mock.async_publish.call_count == 3
+    mqtt_mock.async_publish.assert_any_call("command-topic", "ON", 0, False)
+    mqtt_mock.async_publish.assert_any_call("percentage-command-topic", "25", 0, False)
+    mqtt_mock.async_publish.assert_any_call(
+        "preset-mode-command-topic", "whoosh", 0, False
+    )
+    mqtt_mock.async_publish.reset_mock()
+    state = hass.states.get("fan.test")
+    assert state.state == STATE_ON
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 25
+    assert state.attributes.get(fan.ATTR_PRESET_MODE) == "whoosh"
+    assert state.attributes.get(ATTR_ASSUMED_STATE)
+
+    with pytest.raises(NotValidPresetModeError):
+        await common.async_turn_on(
+            hass, "fan.test", percentage=50, preset_mode="freaking-high"
+        )
+    # The valid commands are still published
+    assert mqtt_mock.async_publish.call_count == 2
+    mqtt_mock.async_publish.assert_any_call("command-topic", "ON", 0, False)
+    mqtt_mock.async_publish.assert_any_call("percentage-command-topic", "50", 0, False)
+    # and their optimistic state is updated
+    state = hass.states.get("fan.test")
+    assert state.state == STATE_ON
+    assert state.attributes.get(fan.ATTR_PERCENTAGE) == 50
+    assert state.attributes.get(fan.ATTR_PRESET_MODE) == "whoosh"
+
+
 async def test_sending_mqtt_command_templates_(
     hass, mqtt_mock_entry_with_yaml_config, caplog
 ):
@@ -1046,6 +1204,50 @@ async def test_sending_mqtt_command_templates_(
         await common.async_turn_on(hass, "fan.test", preset_mode="low")
 
 
+async def test_sending_mqtt_command_templates_with_entity_state(
+    hass, mqtt_mock_entry_with_yaml_config
+):
+    """Test command templates using the entity state are rendered for every command."""
+    assert await async_setup_component(
+        hass,
+        mqtt.DOMAIN,
+        {
+            mqtt.DOMAIN: {
+                fan.DOMAIN: {
+                    "name": "test",
+                    "command_topic": "command-topic",
+                    "command_template": "{{ value }}_{{ this.state }}",
+                    "oscillation_command_topic": "oscillation-command-topic",
+                    "oscillation_command_template": "static-oscillation",
+                }
+            }
+        },
+    )
+    await hass.async_block_till_done()
+    mqtt_mock = await mqtt_mock_entry_with_yaml_config()
+
+    await common.async_turn_on(hass, "fan.test")
+    mqtt_mock.async_publish.assert_called_once_with(
+        "command-topic", "ON_unknown", 0, False
+    )
+    mqtt_mock.async_publish.reset_mock()
+
+    await common.async_turn_off(hass, "fan.test")
+    mqtt_mock.async_publish.assert_called_once_with("command-topic", "OFF_on", 0, False)
+    mqtt_mock.async_publish.reset_mock()
+
+    await common.async_oscillate(hass, "fan.test", True)
+    mqtt_mock.async_publish.assert_called_once_with(
+        "oscillation-command-topic", "static-oscillation", 0, False
+    )
+    mqtt_mock.async_publish.reset_mock()
+
+    await common.async_oscillate(hass, "fan.test", False)
+    mqtt_mock.async_publish.assert_called_once_with(
+        "oscillation-command-topic", "static-oscillation", 0, False
+    )
+
+
 async def test_sending_mqtt_commands_and_optimistic_no_percentage_topic(
     hass, mqtt_mock_entry_with_yaml_config, caplog
 ):
@@ -1780,6 +1982,86 @@ async def test_discovery_update_fan(hass, mqtt_mock_entry_no_yaml_config, caplog
     )
 
 
+async def test_discovery_update_fan_payloads(
+    hass, mqtt_mock_entry_no_yaml_config, caplog
+):
+    """Test updated payloads are used when the discovered topics are unchanged."""
+    config1 = {
+        "name": "Beer",
+        "command_topic": "test_topic",
+        "state_topic": "state-topic",
+        "oscillation_command_topic": "oscillation-command-topic",
+        "oscillation_state_topic": "oscillation-state-topic",
+    }
+    config2 = {
+        "name": "Milk",
+        "command_topic": "test_topic",
+        "state_topic": "state-topic",
+        "oscillation_command_topic": "oscillation-command-topic",
+        "oscillation_state_topic": "oscillation-state-topic",
+        "payload_on": "StAtE_On",
+        "payload_off": "StAtE_OfF",
+        "payload_oscillation_on": "OsC_On",
+        "payload_oscillation_off": "OsC_OfF",
+    }
+    state_data1 = [
+        ([("state-topic", "ON")], STATE_ON, None),
+        ([("oscillation-state-topic", "oscillate_on")], None, None),
+    ]
+    state_data2 = [
+        ([("state-topic", "StAtE_OfF")], STATE_OFF, None),
+        ([("state-topic", "ON")], STATE_OFF, None),
+        ([("state-topic", "StAtE_On")], STATE_ON, None),
+        ([("oscillation-state-topic", "OsC_OfF")], None, [(ATTR_OSCILLATING, False)]),
+        ([("oscillation-state-topic", "OsC_On")], None, [(ATTR_OSCILLATING, True)]),
+    ]
+    await help_test_discovery_update(
+        hass,
+        mqtt_mock_entry_no_yaml_config,
+        caplog,
+        fan.DOMAIN,
+        config1,
+        config2,
+        state_data1=state_data1,
+        state_data2=state_data2,
+    )
+
+
+async def test_discovery_update_fan_shared_topic(
+    hass, mqtt_mock_entry_no_yaml_config, caplog
+):
+    """Test a state topic shared by a discovery update is handled."""
+    config1 = {
+        "name": "Beer",
+        "command_topic": "test_topic",
+        "state_topic": "state-topic",
+    }
+    config2 = {
+        "name": "Milk",
+        "command_topic": "test_topic",
+        "state_topic": "state-topic",
+        "percentage_command_topic": "percentage-command-topic",
+        "percentage_state_topic": "state-topic",
+    }
+    state_data1 = [
+        ([("state-topic", "ON")], STATE_ON, [(ATTR_PERCENTAGE, None)]),
+    ]
+    state_data2 = [
+        ([("state-topic", "50")], STATE_ON, [(ATTR_PERCENTAGE, 50)]),
+        ([("state-topic", "OFF")], STATE_OFF, [(ATTR_PERCENTAGE, 50)]),
+    ]
+    await help_test_discovery_update(
+        hass,
+        mqtt_mock_entry_no_yaml_config,
+        caplog,
+        fan.DOMAIN,
+        config1,
+        config2,
+        state_data1=state_data1,
+        state_data2=state_data2,
+    )
+
+
 async def test_discovery_update_unchanged_fan(
     hass, mqtt_mock_entry_no_yaml_config, caplog
 ):